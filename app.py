@@ -13,8 +13,9 @@ csrf = CSRFProtect()
 
 # Import only essential modules - lazy load others
 try:
-    from models import db, User, init_db
+    from models import db, init_db
     from auth import init_auth
+    from cache import init_cache
     # Lazy import blueprints to reduce startup time
 except ImportError as e:
     print(f"❌ Import error: {e}")
@@ -28,6 +29,7 @@ def create_app(config_class_name='default'):
 
     # Initialize extensions
     csrf.init_app(app)
+    init_cache(app)
 
     # Initialize database and auth
     try:
@@ -66,6 +68,14 @@ def create_app(config_class_name='default'):
     def inject_csrf():
         return dict(csrf_token=getattr(g, 'csrf_token', generate_csrf()))
 
+    # Make the unread notification count available to every template
+    @app.context_processor
+    def inject_unread_count():
+        if not current_user.is_authenticated:
+            return {}
+        from utils import get_unread_count
+        return dict(unread_count=get_unread_count(current_user.email))
+
     # CSRF token refresh endpoint
     @app.route('/refresh_csrf')
     def refresh_csrf():
@@ -78,32 +88,9 @@ def create_app(config_class_name='default'):
     def get_users_by_role():
         """API endpoint to get users grouped by role for dropdowns"""
         try:
-            # Only get active users
-            users = User.query.filter_by(status='Active').all()
-            users_by_role = {
-                'Admin': [],
-                'Engineer': [],
-                'TM': [],
-                'PM': []
-            }
-
-            for user in users:
-                user_data = {
-                    'name': user.full_name,
-                    'email': user.email
-                }
-                
-                # Map database roles to frontend role categories
-                if user.role == 'Admin':
-                    users_by_role['Admin'].append(user_data)
-                elif user.role == 'Engineer':
-                    users_by_role['Engineer'].append(user_data)
-                elif user.role in ['TM', 'Technical Manager', 'Tech Manager', 'Automation Manager']:
-                    users_by_role['TM'].append(user_data)
-                elif user.role in ['PM', 'Project Manager', 'Project_Manager']:
-                    users_by_role['PM'].append(user_data)
-
-            app.logger.info(f"Found {len(users)} total users")
+            from services import UserService
+            users_by_role = UserService.get_users_by_role()
+
             app.logger.info(f"Users by role: TM={len(users_by_role['TM'])}, PM={len(users_by_role['PM'])}, Admin={len(users_by_role['Admin'])}, Engineer={len(users_by_role['Engineer'])}")
             
             return jsonify({'success': True, 'users': users_by_role})
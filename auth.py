@@ -1,24 +1,86 @@
 
 from functools import wraps
 from flask import redirect, url_for, flash, request
-from flask_login import LoginManager, current_user
+from flask_login import LoginManager, UserMixin, current_user
 from models import User
+from cache import cache_get, cache_set, cache_delete
+
+# Session users are served from the cache for this long before re-reading the database
+USER_CACHE_TIMEOUT = 60
+
+# Map database roles to frontend role categories
+ROLE_MAP = {
+    'Admin': 'Admin',
+    'Engineer': 'Engineer',
+    'TM': 'TM',
+    'Technical Manager': 'TM',
+    'Tech Manager': 'TM',
+    'Automation Manager': 'TM',
+    'PM': 'PM',
+    'Project Manager': 'PM',
+    'Project_Manager': 'PM'
+}
 
 login_manager = LoginManager()
 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
 
+class CachedUser(UserMixin):
+    """Lightweight session user rebuilt from cached fields instead of the ORM"""
 
+    def __init__(self, id, full_name, email, role, status):
+        self.id = id
+        self.full_name = full_name
+        self.email = email
+        self.role = role
+        self.status = status
 
+    @staticmethod
+    def serialize(user):
+        return {
+            'id': user.id,
+            'full_name': user.full_name,
+            'email': user.email,
+            'role': user.role,
+            'status': user.status
+        }
 
+    def is_active(self):
+        return self.status == 'Active'
 
+    def check_password(self, password):
+        user = User.query.get(self.id)
+        return user is not None and user.check_password(password)
+
+    def set_password(self, password):
+        # Loads the ORM row into the session so the caller's commit persists it
+        User.query.get(self.id).set_password(password)
+
+
+def _user_cache_key(user_id):
+    return f'user:{user_id}'
+
+
+def invalidate_user_cache(user_id):
+    """Drop a cached session user after its role or status changed"""
+    cache_delete(_user_cache_key(user_id))
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    key = _user_cache_key(user_id)
+    data = cache_get(key)
+    if data is None:
+        user = User.query.get(int(user_id))
+        if not user:
+            return None
+        data = CachedUser.serialize(user)
+        cache_set(key, data, timeout=USER_CACHE_TIMEOUT)
+    return CachedUser(**data)
 
-login_manager = LoginManager()
 
 def init_auth(app):
     """Initialize authentication"""
+    assert login_manager._user_callback is load_user, 'load_user is not registered on login_manager'
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -49,3 +111,26 @@ def admin_required(f):
             return redirect(url_for('dashboard.home'))
         return f(*args, **kwargs)
     return decorated_function
+
+def canonical_role(role):
+    """Map a stored role name such as 'Technical Manager' onto its role category"""
+    return ROLE_MAP.get(role, role)
+
+def role_required(roles):
+    """Decorator to require one of the given roles"""
+    allowed_roles = frozenset(canonical_role(role) for role in roles)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return redirect(url_for('auth.login', next=request.url))
+            if not current_user.is_active():
+                flash('Your account is not active. Please contact an administrator.', 'warning')
+                return redirect(url_for('auth.login'))
+            if canonical_role(current_user.role) not in allowed_roles:
+                flash('You do not have permission to access this page.', 'error')
+                return redirect(url_for('dashboard.home'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,53 @@
+"""
+Shared application cache
+Backed by Redis when REDIS_URL is configured, falls back to an in-process cache otherwise
+"""
+
+import logging
+
+from flask_caching import Cache
+
+cache = Cache()
+
+logger = logging.getLogger(__name__)
+
+
+def init_cache(app):
+    """Initialize the shared cache"""
+    cache.init_app(app)
+
+
+# The cache is an optimization, so a Redis outage degrades to database reads instead of
+# failing the request (cache.memoize already behaves this way)
+
+def cache_get(key):
+    """Read a cached value, None on a miss or when the cache is unreachable"""
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {e}")
+        return None
+
+
+def cache_set(key, value, timeout=None):
+    """Store a value, ignoring cache outages"""
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Cache write failed for {key}: {e}")
+
+
+def cache_delete(key):
+    """Drop a cached value, ignoring cache outages"""
+    try:
+        cache.delete(key)
+    except Exception as e:
+        logger.warning(f"Cache delete failed for {key}: {e}")
+
+
+def cache_delete_memoized(f, *args):
+    """Drop memoized results of f, ignoring cache outages"""
+    try:
+        cache.delete_memoized(f, *args)
+    except Exception as e:
+        logger.warning(f"Cache delete failed for {f.__qualname__}: {e}")
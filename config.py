@@ -21,10 +21,20 @@ class Config:
     INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': False,  # Disable for faster startup
-        'pool_recycle': 600,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_pre_ping': True,  # Drop dead connections on checkout instead of failing the request
+        'pool_recycle': 300,
+        'insertmanyvalues_page_size': 1000,  # Rows per multi-VALUES INSERT batch
     }
 
+    # Cache - Redis when available, in-process fallback for local development
+    REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_TYPE = 'RedisCache' if REDIS_URL else 'SimpleCache'
+    CACHE_REDIS_URL = REDIS_URL
+    CACHE_KEY_PREFIX = 'sat:'
+    CACHE_DEFAULT_TIMEOUT = 60
+
     # File paths
     UPLOAD_ROOT = os.environ.get('UPLOAD_ROOT') or 'static/uploads'
     SIGNATURES_FOLDER = os.environ.get('SIGNATURES_FOLDER') or 'static/signatures'
@@ -94,7 +104,7 @@ class ProductionConfig(Config):
 
         # Log to syslog in production
         import logging
-from logging.handlers import SysLogHandler
+        from logging.handlers import SysLogHandler
         syslog_handler = SysLogHandler()
         syslog_handler.setLevel(logging.WARNING)
         app.logger.addHandler(syslog_handler)
@@ -103,7 +113,10 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # In-memory SQLite uses a single static connection
     WTF_CSRF_ENABLED = False
+    CACHE_TYPE = 'NullCache'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'  # Single iteration, tests never need a slow hash
 
 # Configuration dictionary
 config = {
@@ -1,6 +1,11 @@
 import os
+import time
+import uuid
 from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, inspect
+from sqlalchemy.schema import CreateIndex
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -12,6 +17,9 @@ _db_initialized = False
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('idx_user_role_status', 'role', 'status'),  # Composite index for role directory lookups
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
@@ -23,7 +31,8 @@ class User(UserMixin, db.Model):
     requested_role = db.Column(db.String(20), nullable=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        self.password_hash = generate_password_hash(password, method=method)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -59,14 +68,27 @@ class SystemSettings(db.Model):
         db.session.commit()
         return setting
 
+def generate_report_id():
+    """Generate a time-ordered UUIDv7 string so new reports land at the end of the primary key index"""
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), 'big')
+    value = (timestamp_ms & ((1 << 48) - 1)) << 80   # 48-bit Unix timestamp in milliseconds
+    value |= 0x7 << 76                               # version 7
+    value |= (rand >> 68) << 64                      # 12 random bits
+    value |= 0b10 << 62                              # RFC 9562 variant
+    value |= rand & ((1 << 62) - 1)                  # 62 random bits
+    return str(uuid.UUID(int=value))
+
 class Report(db.Model):
     __tablename__ = 'reports'
     __table_args__ = (
-        db.Index('idx_report_status_user', 'status', 'user_email'),  # Composite index
+        db.Index('idx_report_user_status', 'user_email', 'status'),  # Index for per-user status counts
         db.Index('idx_report_updated', 'updated_at'),  # Index for sorting
+        db.Index('idx_report_status_updated', 'status', 'updated_at'),  # Index for stale draft cleanup
+        db.Index('idx_report_status_stage', 'status', 'approval_stage'),  # Index for pending approval counts
     )
 
-    id = db.Column(db.String(36), primary_key=True)  # UUID
+    id = db.Column(db.String(36), primary_key=True)  # UUIDv7, see generate_report_id()
     type = db.Column(db.String(20), nullable=False, index=True)  # Added index
     status = db.Column(db.String(20), default='DRAFT', index=True)  # Added index
     document_title = db.Column(db.String(200), nullable=True)
@@ -81,6 +103,7 @@ class Report(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     locked = db.Column(db.Boolean, default=False)
     approvals_json = db.Column(db.Text, nullable=True)
+    approval_stage = db.Column(db.Integer, nullable=True)  # Current stage, mirrored from approvals_json
     approval_notification_sent = db.Column(db.Boolean, default=False)
 
     # Relationships
@@ -234,6 +257,69 @@ def init_db(app):
         return False
 
 
+def upgrade_schema():
+    """
+    Add columns and indexes that db.create_all() skips on existing tables
+    Run once per deploy through upgrade_db.py, not on every app start
+    """
+    import json
+
+    report_columns = {column['name'] for column in inspect(db.engine).get_columns('reports')}
+    if 'approval_stage' not in report_columns:
+        with db.engine.begin() as conn:
+            conn.execute(db.text('ALTER TABLE reports ADD COLUMN approval_stage INTEGER'))
+
+        # Backfill the stage from workflows initialized before the column existed
+        stages = []
+        for report_id, approvals_json in db.session.query(Report.id, Report.approvals_json).filter(
+            Report.approvals_json.isnot(None)
+        ):
+            try:
+                approvals = json.loads(approvals_json)
+            except ValueError:
+                continue
+            if isinstance(approvals, dict) and approvals.get('stage') is not None:
+                stages.append({'report_id': report_id, 'stage': approvals['stage']})
+        if stages:
+            # Keep updated_at as-is so the backfill does not reorder recent report listings
+            reports = Report.__table__
+            db.session.execute(
+                reports.update()
+                .where(reports.c.id == bindparam('report_id'))
+                .values(approval_stage=bindparam('stage'), updated_at=reports.c.updated_at),
+                stages
+            )
+        db.session.commit()
+
+    # Build missing indexes outside a transaction so Postgres can do it without blocking writes
+    inspector = inspect(db.engine)
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        # idx_report_user_status replaced it, status-only lookups use the other status-led indexes
+        if 'idx_report_status_user' in {index['name'] for index in inspector.get_indexes('reports')}:
+            concurrently = ' CONCURRENTLY' if conn.dialect.name == 'postgresql' else ''
+            conn.execute(db.text(f'DROP INDEX{concurrently} idx_report_status_user'))
+
+        invalid = set()
+        if conn.dialect.name == 'postgresql':
+            # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind under the same name
+            invalid = set(conn.execute(db.text(
+                'SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE NOT i.indisvalid'
+            )).scalars())
+        for table in (User.__table__, Report.__table__, Notification.__table__):
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in invalid:
+                    conn.execute(db.text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    existing.discard(index.name)
+                if index.name in existing:
+                    continue
+                ddl = str(CreateIndex(index).compile(dialect=conn.dialect))
+                if conn.dialect.name == 'postgresql':
+                    ddl = ddl.replace('INDEX', 'INDEX CONCURRENTLY', 1)
+                conn.execute(db.text(ddl))
+
+
 def import_json_to_db():
     """One-time import of existing JSON submissions to database"""
     import json
@@ -407,6 +493,7 @@ class Notification(db.Model):
     __table_args__ = (
         db.Index('idx_notification_user_read', 'user_email', 'read'),  # Composite index for unread queries
         db.Index('idx_notification_created', 'created_at'),  # Index for sorting
+        db.Index('idx_notification_read_created', 'read', 'created_at'),  # Index for old notification cleanup
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -446,6 +533,9 @@ class Notification(db.Model):
         )
         db.session.add(notification)
         db.session.commit()
+        # services imports models, so it can only be imported once the call happens
+        from services import NotificationService
+        NotificationService.invalidate_unread_count(user_email)
         return notification
 
     @staticmethod
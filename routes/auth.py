@@ -201,16 +201,6 @@ def reset_password():
 @login_required
 def change_password():
     """Change user password"""
-    try:
-        from models import Notification
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count: {e}")
-        unread_count = 0
-
     if request.method == 'POST':
         current_password = request.form.get('current_password')
         new_password = request.form.get('new_password')
@@ -219,16 +209,16 @@ def change_password():
         # Validate current password
         if not current_user.check_password(current_password):
             flash('Current password is incorrect', 'error')
-            return render_template('change_password.html', unread_count=unread_count)
+            return render_template('change_password.html')
 
         # Validate new password
         if new_password != confirm_password:
             flash('New passwords do not match', 'error')
-            return render_template('change_password.html', unread_count=unread_count)
+            return render_template('change_password.html')
 
         if len(new_password) < 6:
             flash('Password must be at least 6 characters long', 'error')
-            return render_template('change_password.html', unread_count=unread_count)
+            return render_template('change_password.html')
 
         try:
             # Update password
@@ -240,6 +230,6 @@ def change_password():
         except Exception as e:
             current_app.logger.error(f"Error changing password: {e}")
             flash('An error occurred while changing password', 'error')
-            return render_template('change_password.html', unread_count=unread_count)
+            return render_template('change_password.html')
 
-    return render_template('change_password.html', unread_count=unread_count)
\ No newline at end of file
+    return render_template('change_password.html')
\ No newline at end of file
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
-from auth import admin_required, role_required
+from auth import admin_required, role_required, invalidate_user_cache
 from models import db, User, Report, SystemSettings, test_db_connection
+from services import UserService
 
 
 
@@ -29,7 +30,7 @@ def home():
 @admin_required
 def admin():
     """Admin dashboard"""
-    from models import Report, Notification
+    from models import Report
 
     users = User.query.all()
     db_connected = test_db_connection()
@@ -38,16 +39,6 @@ def admin():
     total_users = len(users)
     pending_users_count = len([u for u in users if u.status == 'Pending'])
 
-    # Get unread notifications count
-    try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count for admin: {e}")
-        unread_count = 0
-
     # Get actual pending users (users who need approval)
     pending_users_list = User.query.filter_by(status='Pending').order_by(User.created_date.desc()).limit(5).all()
 
@@ -117,16 +108,6 @@ def engineer():
     from models import Report
     
 
-    # Get unread notifications count
-    try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count for engineer: {e}")
-        unread_count = 0
-
     # Get report statistics for current user
     user_reports = Report.query.filter_by(user_email=current_user.email).all()
 
@@ -157,7 +138,7 @@ def engineer():
         'approved_reports': approved_reports
     }
 
-    return render_template('engineer_dashboard.html', stats=stats, unread_count=unread_count)
+    return render_template('engineer_dashboard.html', stats=stats)
 
 @dashboard_bp.route('/tm')
 @role_required(['TM'])
@@ -166,16 +147,6 @@ def tm():
     from models import Report
     
 
-    # Get unread notifications count
-    try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count for TM: {e}")
-        unread_count = 0
-
     # Get reports count for TM
     reports_count = Report.query.filter_by(status='pending_review').count()
 
@@ -209,7 +180,6 @@ def tm():
         db_status = False
 
     return render_template('tm_dashboard.html',
-                         unread_count=unread_count,
                          reports_count=reports_count,
                          pending_approvals=pending_approvals,
                          approved_reports_count=approved_reports_count,
@@ -241,8 +211,7 @@ def tm():
                          pending_approvals=pending_approvals,
                          approved_reports=approved_reports_count,
                          team_reports=team_reports_count,
-                         recent_reports=pending_reports,
-                         unread_count=unread_count)
+                         recent_reports=pending_reports)
 
 
 @dashboard_bp.route('/pm')
@@ -252,16 +221,6 @@ def pm():
     from models import Report
     
 
-    # Get unread notifications count
-    try:
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count for PM: {e}")
-        unread_count = 0
-
     # Get basic statistics for PM dashboard
     try:
         # For now, show placeholder data - in future this would be filtered by projects the PM manages
@@ -278,8 +237,7 @@ def pm():
                              pending_deliverables=pending_deliverables,
                              completed_reports=completed_reports,
                              on_time_percentage=on_time_percentage,
-                             recent_reports=recent_reports,
-                             unread_count=unread_count)
+                             recent_reports=recent_reports)
     except Exception as e:
         # If there's any error, provide default values
         current_app.logger.error(f"Error in PM dashboard: {e}")
@@ -288,8 +246,7 @@ def pm():
                              pending_deliverables=0,
                              completed_reports=0,
                              on_time_percentage=0,
-                             recent_reports=[],
-                             unread_count=0)
+                             recent_reports=[])
 
 # Legacy redirects for dashboard routes
 @dashboard_bp.route('/technical-manager')
@@ -333,6 +290,8 @@ def approve_user(user_id):
 
     try:
         db.session.commit()
+        invalidate_user_cache(user.id)
+        UserService.invalidate_directory()
         flash(f'User {user.full_name} approved as {role}.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -355,6 +314,8 @@ def disable_user(user_id):
 
     try:
         db.session.commit()
+        invalidate_user_cache(user.id)
+        UserService.invalidate_directory()
         flash(f'User {user.full_name} disabled.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -372,6 +333,8 @@ def enable_user(user_id):
 
     try:
         db.session.commit()
+        invalidate_user_cache(user.id)
+        UserService.invalidate_directory()
         flash(f'User {user.full_name} enabled.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -400,6 +363,8 @@ def change_user_role(user_id):
 
     try:
         db.session.commit()
+        invalidate_user_cache(user.id)
+        UserService.invalidate_directory()
         flash(f'User {user.full_name} role changed from {old_role} to {new_role}.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -429,6 +394,8 @@ def delete_user(user_id):
         # Delete the user
         db.session.delete(user)
         db.session.commit()
+        invalidate_user_cache(user_id)
+        UserService.invalidate_directory()
         flash(f'User {user_name} ({user_email}) has been permanently deleted.', 'success')
     except Exception as e:
         db.session.rollback()
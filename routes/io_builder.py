@@ -1,32 +1,14 @@
 from flask import Blueprint, request, jsonify, current_app, render_template
-from flask_login import login_required, current_user
+from flask_login import login_required
 from models import db, ModuleSpec
 
 io_builder_bp = Blueprint('io_builder', __name__)
 
-def get_unread_count():
-    """Get unread notifications count with error handling"""
-    try:
-        from models import Notification
-        return Notification.query.filter_by(
-            user_email=current_user.email, 
-            read=False
-        ).count()
-    except Exception as e:
-        current_app.logger.warning(f"Could not get unread count: {e}")
-        return 0
-
 @io_builder_bp.route('/')
 @login_required
 def index():
     """IO Builder main page"""
-    try:
-        unread_count = get_unread_count()
-        return render_template('io_builder.html', unread_count=unread_count)
-    except Exception as e:
-        current_app.logger.error(f"Error rendering io_builder index: {e}")
-        # Fallback to a default render_template or error page
-        return render_template('io_builder.html', unread_count=0)
+    return render_template('io_builder.html')
 
 # Vendor-specific search configurations
 VENDOR_CONFIGS = {
@@ -14,7 +14,7 @@ except ImportError as e:
     Report = None
     SATReport = None
     def test_db_connection():
-    return False
+        return False
 
 try:
     from utils import (send_edit_link,
@@ -70,6 +70,7 @@ def create_approval_notification(approver_email, submission_id, stage, document_
     """Create approval notification"""
     try:
         from models import Notification, db
+        from services import NotificationService
         
         notification = Notification(
             user_email=approver_email,
@@ -80,6 +81,7 @@ def create_approval_notification(approver_email, submission_id, stage, document_
         )
         db.session.add(notification)
         db.session.commit()
+        NotificationService.invalidate_unread_count(approver_email)
         return True
     except Exception as e:
         current_app.logger.error(f"Error creating approval notification: {e}")
@@ -89,6 +91,7 @@ def create_new_submission_notification(admin_emails, submission_id, document_tit
     """Create new submission notification for admins"""
     try:
         from models import Notification, db
+        from services import NotificationService
         
         for email in admin_emails:
             notification = Notification(
@@ -101,6 +104,8 @@ def create_new_submission_notification(admin_emails, submission_id, document_tit
             db.session.add(notification)
         
         db.session.commit()
+        for email in admin_emails:
+            NotificationService.invalidate_unread_count(email)
         return True
     except Exception as e:
         current_app.logger.error(f"Error creating submission notifications: {e}")
@@ -222,14 +227,14 @@ def generate():
         current_app.logger.info(f"Request form data keys: {list(request.form.keys())}")
 
         # Import database models
-        from models import db, Report, SATReport
+        from models import db, Report, SATReport, generate_report_id
 
         # Retrieve submission id and current report
         submission_id = request.form.get("submission_id", "")
 
         # Create a new submission ID if needed
         if not submission_id:
-            submission_id = str(uuid.uuid4())
+            submission_id = generate_report_id()
 
         # Get or create report record
         report = Report.query.get(submission_id)
@@ -812,12 +817,12 @@ def generate():
 def save_progress():
     """Save form progress without generating report"""
     try:
-        from models import db, Report, SATReport
+        from models import db, Report, SATReport, generate_report_id
 
         # Get submission ID or create new one
         submission_id = request.form.get("submission_id", "")
         if not submission_id:
-            submission_id = str(uuid.uuid4())
+            submission_id = generate_report_id()
 
         # Get or create report record
         report = Report.query.get(submission_id)
@@ -916,12 +921,12 @@ def save_progress():
 def auto_save_progress():
     """Auto-save form progress with CSRF validation"""
     try:
-        from models import db, Report, SATReport
+        from models import db, Report, SATReport, generate_report_id
 
         # Get submission ID or create new one
         submission_id = request.form.get("submission_id", "")
         if not submission_id:
-            submission_id = str(uuid.uuid4())
+            submission_id = generate_report_id()
 
         # Get form data
         form_data = request.form.to_dict()
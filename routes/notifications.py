@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user
 from models import db, Notification
 from auth import login_required
+from services import NotificationService
 
 try:
     from models import db, Notification
@@ -60,10 +61,7 @@ def get_unread_count_api():
         if not current_user.is_authenticated:
             return jsonify({'count': 0})
 
-        unread_count = Notification.query.filter_by(
-            user_email=current_user.email,
-            read=False
-        ).count()
+        unread_count = NotificationService.get_unread_count(current_user.email)
         return jsonify({'count': unread_count})
     except Exception as e:
         current_app.logger.warning(f"Notifications not available: {e}")
@@ -80,6 +78,7 @@ def mark_notification_read(notification_id):
 
         notification.read = True
         db.session.commit()
+        NotificationService.invalidate_unread_count(current_user.email)
 
         return jsonify({'success': True})
     except Exception as e:
@@ -93,6 +92,7 @@ def mark_all_read():
         Notification.query.filter_by(user_email=current_user.email, read=False)\
                          .update({'read': True})
         db.session.commit()
+        NotificationService.invalidate_unread_count(current_user.email)
 
         return jsonify({'success': True})
     except Exception as e:
@@ -23,7 +23,7 @@ def new_sat():
 def new_sat_full():
     """Full SAT report form"""
     try:
-        import uuid
+        from models import generate_report_id
         from utils import get_unread_count
         
         # Create empty submission data structure for new forms
@@ -62,7 +62,7 @@ def new_sat_full():
         }
         
         unread_count = get_unread_count()
-        submission_id = str(uuid.uuid4())
+        submission_id = generate_report_id()
         
         return render_template('SAT.html', 
                              submission_data=submission_data,
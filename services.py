@@ -9,21 +9,67 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any
 from werkzeug.exceptions import NotFound
 from flask import current_app
-from models import db, User, Report, SATReport, SystemSettings, Notification
-from utils import send_email_notification, generate_report_document
-import uuid
+from sqlalchemy import and_, false
+from sqlalchemy.orm import load_only, raiseload
+from models import (db, User, Report, SATReport, FDSReport, HDSReport, SiteSurveyReport,
+                    SDSReport, FATReport, SystemSettings, Notification, generate_report_id)
+from auth import ROLE_MAP, invalidate_user_cache
+from tasks import send_email_async
+from cache import cache, cache_get, cache_set, cache_delete, cache_delete_memoized
+
+# orjson serializes large form payloads several times faster than the stdlib when installed
+try:
+    import orjson
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_dumps = json.dumps
 
 logger = logging.getLogger(__name__)
 
+# Admin dashboard counts change slowly, so they are served from the cache briefly
+ADMIN_STATS_CACHE_KEY = 'admin_stats'
+ADMIN_STATS_CACHE_TIMEOUT = 30
+UNREAD_COUNT_CACHE_TIMEOUT = 30
+
+# The user directory only changes when users are created, approved or disabled
+USER_DIRECTORY_CACHE_TIMEOUT = 300
+TM_EMAILS_CACHE_KEY = 'users:role:TM'
+
+# Rows deleted per transaction by cleanup_old_data, bounds lock time on large tables
+CLEANUP_BATCH_SIZE = 10000
+
+# Approval workflow every report starts with when it is submitted
+INITIAL_APPROVALS = {
+    'stage': 1,
+    'approvers': [
+        {'stage': 1, 'title': 'Technical Manager', 'status': 'pending'},
+        {'stage': 2, 'title': 'Project Manager', 'status': 'pending'}
+    ]
+}
+INITIAL_APPROVALS_JSON = json_dumps(INITIAL_APPROVALS)
+
+# Approval stage each manager role signs off: TMs at stage 1, PMs at stage 2
+APPROVAL_STAGE_BY_ROLE = {
+    'TM': 1,
+    'Technical Manager': 1,
+    'PM': 2,
+    'Project Manager': 2
+}
+
 
 class UserService:
     """Service for user-related operations"""
     
     @staticmethod
+    @cache.memoize(timeout=USER_DIRECTORY_CACHE_TIMEOUT)
     def get_users_by_role() -> Dict[str, List[Dict[str, str]]]:
         """Get active users grouped by role"""
         try:
-            users = User.query.filter_by(status='Active').all()
+            users = db.session.query(
+                User.full_name, User.email, User.role
+            ).filter_by(status='Active').all()
             users_by_role = {
                 'Admin': [],
                 'Engineer': [],
@@ -31,27 +77,34 @@ class UserService:
                 'PM': []
             }
             
-            for user in users:
-                user_data = {
-                    'name': user.full_name,
-                    'email': user.email
-                }
-                
-                # Map database roles to frontend role categories
-                if user.role == 'Admin':
-                    users_by_role['Admin'].append(user_data)
-                elif user.role == 'Engineer':
-                    users_by_role['Engineer'].append(user_data)
-                elif user.role in ['TM', 'Technical Manager', 'Tech Manager', 'Automation Manager']:
-                    users_by_role['TM'].append(user_data)
-                elif user.role in ['PM', 'Project Manager', 'Project_Manager']:
-                    users_by_role['PM'].append(user_data)
+            for name, email, role in users:
+                bucket = ROLE_MAP.get(role)
+                if bucket:
+                    users_by_role[bucket].append({'name': name, 'email': email})
             
             return users_by_role
         except Exception as e:
             logger.error(f"Error getting users by role: {e}")
             raise
     
+    @staticmethod
+    def get_tm_emails() -> List[str]:
+        """Get email addresses of active Technical Managers"""
+        tm_emails = cache_get(TM_EMAILS_CACHE_KEY)
+        if tm_emails is None:
+            tm_emails = [email for (email,) in User.query.filter(
+                User.role.in_(['TM', 'Technical Manager']),
+                User.status == 'Active'
+            ).with_entities(User.email)]
+            cache_set(TM_EMAILS_CACHE_KEY, tm_emails, timeout=USER_DIRECTORY_CACHE_TIMEOUT)
+        return tm_emails
+    
+    @staticmethod
+    def invalidate_directory() -> None:
+        """Drop cached role lookups after a user is added or changes role or status"""
+        cache_delete_memoized(UserService.get_users_by_role)
+        cache_delete(TM_EMAILS_CACHE_KEY)
+    
     @staticmethod
     def create_user(data: Dict[str, Any]) -> User:
         """Create a new user"""
@@ -65,6 +118,9 @@ class UserService:
             user.set_password(data['password'])
             db.session.add(user)
             db.session.commit()
+            invalidate_user_cache(user.id)
+            UserService.invalidate_directory()
+            DashboardService.invalidate_admin_stats()
             return user
         except Exception as e:
             db.session.rollback()
@@ -81,6 +137,9 @@ class UserService:
             
             user.status = status
             db.session.commit()
+            invalidate_user_cache(user_id)
+            UserService.invalidate_directory()
+            DashboardService.invalidate_admin_stats()
             return True
         except Exception as e:
             db.session.rollback()
@@ -95,7 +154,7 @@ class ReportService:
     def create_report(data: Dict[str, Any], user_email: str) -> Report:
         """Create a new report"""
         try:
-            report_id = str(uuid.uuid4())
+            report_id = generate_report_id()
             
             report = Report(
                 id=report_id,
@@ -115,7 +174,7 @@ class ReportService:
             if report.type == 'SAT':
                 sat_report = SATReport(
                     report_id=report_id,
-                    data_json=json.dumps(data),
+                    data_json=json_dumps(data),
                     date=data.get('date'),
                     purpose=data.get('purpose'),
                     scope=data.get('scope')
@@ -124,6 +183,7 @@ class ReportService:
             
             db.session.add(report)
             db.session.commit()
+            DashboardService.invalidate_admin_stats()
             return report
         except Exception as e:
             db.session.rollback()
@@ -131,22 +191,22 @@ class ReportService:
             raise
     
     @staticmethod
-    def get_user_reports(user_email: str, role: str) -> List[Report]:
-        """Get reports based on user role"""
+    def get_user_reports(user_email: str, role: str, page: int = 1, per_page: int = 20):
+        """Get a page of reports based on user role"""
         try:
-            query = Report.query
+            query = Report.query.options(
+                load_only(Report.id, Report.document_title, Report.status,
+                          Report.updated_at, Report.user_email),
+                raiseload('*')
+            )
             
-            if role == 'Admin':
-                # Admin sees all reports
-                reports = query.all()
-            elif role in ['TM', 'Technical Manager', 'PM', 'Project Manager']:
-                # Managers see all reports
-                reports = query.all()
-            else:
-                # Engineers only see their own reports
-                reports = query.filter_by(user_email=user_email).all()
+            # Admins and managers see all reports, engineers only their own
+            if role not in ['Admin', 'TM', 'Technical Manager', 'PM', 'Project Manager']:
+                query = query.filter_by(user_email=user_email)
             
-            return reports
+            return query.order_by(Report.updated_at.desc()).paginate(
+                page=page, per_page=per_page, error_out=False
+            )
         except Exception as e:
             logger.error(f"Error getting user reports: {e}")
             raise
@@ -163,25 +223,21 @@ class ReportService:
             report.status = status
             report.updated_at = datetime.utcnow()
             
-            # Update approvals if needed
+            # Initialize approval workflow
             if status == 'PENDING' and old_status == 'DRAFT':
-                # Initialize approval workflow
-                approvals = {
-                    'stage': 1,
-                    'approvers': [
-                        {'stage': 1, 'title': 'Technical Manager', 'status': 'pending'},
-                        {'stage': 2, 'title': 'Project Manager', 'status': 'pending'}
-                    ]
-                }
-                report.approvals_json = json.dumps(approvals)
+                report.approvals_json = INITIAL_APPROVALS_JSON
+                report.approval_stage = INITIAL_APPROVALS['stage']
+            
+            notify_approvers = status == 'PENDING' and not report.approval_notification_sent
+            if notify_approvers:
+                report.approval_notification_sent = True
             
             db.session.commit()
+            DashboardService.invalidate_admin_stats()
             
-            # Send notifications if needed
-            if status == 'PENDING' and not report.approval_notification_sent:
+            # Send notifications once the status change is committed
+            if notify_approvers:
                 NotificationService.create_approval_notification(report)
-                report.approval_notification_sent = True
-                db.session.commit()
             
             return True
         except Exception as e:
@@ -193,33 +249,17 @@ class ReportService:
     def get_pending_approvals(user_role: str) -> int:
         """Get count of pending approvals for a role"""
         try:
-            if user_role in ['TM', 'Technical Manager']:
-                # TMs see reports at stage 1
-                reports = Report.query.filter_by(status='PENDING').all()
-                count = sum(1 for r in reports if ReportService._is_at_stage(r, 1))
-            elif user_role in ['PM', 'Project Manager']:
-                # PMs see reports at stage 2
-                reports = Report.query.filter_by(status='PENDING').all()
-                count = sum(1 for r in reports if ReportService._is_at_stage(r, 2))
-            else:
-                count = 0
+            stage = APPROVAL_STAGE_BY_ROLE.get(user_role)
+            if stage is None:
+                return 0
             
-            return count
+            return db.session.query(db.func.count(Report.id)).filter(
+                Report.status == 'PENDING',
+                Report.approval_stage == stage
+            ).scalar()
         except Exception as e:
             logger.error(f"Error getting pending approvals: {e}")
             return 0
-    
-    @staticmethod
-    def _is_at_stage(report: Report, stage: int) -> bool:
-        """Check if report is at specific approval stage"""
-        if not report.approvals_json:
-            return False
-        
-        try:
-            approvals = json.loads(report.approvals_json)
-            return approvals.get('stage') == stage
-        except Exception:
-            return False
 
 
 class NotificationService:
@@ -239,6 +279,7 @@ class NotificationService:
             )
             db.session.add(notification)
             db.session.commit()
+            NotificationService.invalidate_unread_count(user_email)
             return notification
         except Exception as e:
             db.session.rollback()
@@ -250,44 +291,56 @@ class NotificationService:
         """Create approval notifications for relevant users"""
         try:
             # Get TMs for stage 1 approval
-            tms = User.query.filter(
-                User.role.in_(['TM', 'Technical Manager']),
-                User.status == 'Active'
-            ).all()
-            
-            for tm in tms:
-                NotificationService.create_notification(
-                    tm.email,
-                    'New Report for Approval',
-                    f'Report "{report.document_title}" requires your approval',
-                    'approval'
-                )
+            tm_emails = UserService.get_tm_emails()
             
-            # Send email notifications if enabled
-            if current_app.config.get('ENABLE_EMAIL_NOTIFICATIONS'):
-                for tm in tms:
-                    send_email_notification(
-                        tm.email,
-                        'New Report Pending Approval',
-                        f'A new report "{report.document_title}" is pending your approval.'
-                    )
+            if not tm_emails:
+                return True
             
-            return True
+            db.session.bulk_insert_mappings(Notification, [
+                {
+                    'user_email': email,
+                    'title': 'New Report for Approval',
+                    'message': f'Report "{report.document_title}" requires your approval',
+                    'type': 'approval',
+                    'read': False
+                }
+                for email in tm_emails
+            ])
+            db.session.commit()
+            for email in tm_emails:
+                NotificationService.invalidate_unread_count(email)
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error creating approval notifications: {e}")
             return False
+        
+        # Queue email notifications if enabled, the notifications above are committed either way
+        if current_app.config.get('ENABLE_EMAIL_NOTIFICATIONS'):
+            for email in tm_emails:
+                try:
+                    send_email_async.delay(
+                        email,
+                        'New Report Pending Approval',
+                        f'A new report "{report.document_title}" is pending your approval.'
+                    )
+                except Exception as e:
+                    logger.error(f"Error queueing approval email to {email}: {e}")
+        
+        return True
     
     @staticmethod
+    @cache.memoize(timeout=UNREAD_COUNT_CACHE_TIMEOUT)
     def get_unread_count(user_email: str) -> int:
-        """Get count of unread notifications for a user"""
-        try:
-            return Notification.query.filter_by(
-                user_email=user_email,
-                read=False
-            ).count()
-        except Exception as e:
-            logger.error(f"Error getting unread count: {e}")
-            return 0
+        """Get count of unread notifications for a user, errors propagate so they are never memoized"""
+        return Notification.query.filter_by(
+            user_email=user_email,
+            read=False
+        ).count()
+    
+    @staticmethod
+    def invalidate_unread_count(user_email: str) -> None:
+        """Drop a user's cached unread count after their notifications change"""
+        cache_delete_memoized(NotificationService.get_unread_count, user_email)
     
     @staticmethod
     def mark_as_read(notification_id: int, user_email: str) -> bool:
@@ -302,6 +355,7 @@ class NotificationService:
                 notification.read = True
                 notification.read_at = datetime.utcnow()
                 db.session.commit()
+                NotificationService.invalidate_unread_count(user_email)
                 return True
             return False
         except Exception as e:
@@ -317,13 +371,18 @@ class DashboardService:
     def get_engineer_stats(user_email: str) -> Dict[str, int]:
         """Get statistics for engineer dashboard"""
         try:
-            reports = Report.query.filter_by(user_email=user_email).all()
+            counts = dict(
+                db.session.query(Report.status, db.func.count(Report.id))
+                .filter(Report.user_email == user_email)
+                .group_by(Report.status)
+                .all()
+            )
             
             return {
-                'total_reports': len(reports),
-                'pending_reports': sum(1 for r in reports if r.status == 'PENDING'),
-                'approved_reports': sum(1 for r in reports if r.status == 'APPROVED'),
-                'draft_reports': sum(1 for r in reports if r.status == 'DRAFT')
+                'total_reports': sum(counts.values()),
+                'pending_reports': counts.get('PENDING', 0),
+                'approved_reports': counts.get('APPROVED', 0),
+                'draft_reports': counts.get('DRAFT', 0)
             }
         except Exception as e:
             logger.error(f"Error getting engineer stats: {e}")
@@ -332,28 +391,32 @@ class DashboardService:
     @staticmethod
     def get_admin_stats() -> Dict[str, Any]:
         """Get statistics for admin dashboard"""
+        stats = cache_get(ADMIN_STATS_CACHE_KEY)
+        if stats is not None:
+            return stats
+        
         try:
-            total_users = User.query.count()
-            active_users = User.query.filter_by(status='Active').count()
-            pending_users = User.query.filter_by(status='Pending').count()
-            total_reports = Report.query.count()
-            pending_reports = Report.query.filter_by(status='PENDING').count()
+            total_users, active_users, pending_users = db.session.query(
+                db.func.count(User.id),
+                db.func.count(User.id).filter(User.status == 'Active'),
+                db.func.count(User.id).filter(User.status == 'Pending')
+            ).one()
+            total_reports, pending_reports = db.session.query(
+                db.func.count(Report.id),
+                db.func.count(Report.id).filter(Report.status == 'PENDING')
+            ).one()
             
-            # Get database status
-            try:
-                db.session.execute('SELECT 1')
-                db_status = 'Connected'
-            except Exception:
-                db_status = 'Disconnected'
-            
-            return {
+            stats = {
                 'total_users': total_users,
                 'active_users': active_users,
                 'pending_users': pending_users,
                 'total_reports': total_reports,
                 'pending_reports': pending_reports,
-                'database_status': db_status
+                # The counts above just ran on a pre-pinged connection
+                'database_status': 'Connected'
             }
+            cache_set(ADMIN_STATS_CACHE_KEY, stats, timeout=ADMIN_STATS_CACHE_TIMEOUT)
+            return stats
         except Exception as e:
             logger.error(f"Error getting admin stats: {e}")
             return {
@@ -365,16 +428,34 @@ class DashboardService:
                 'database_status': 'Error'
             }
     
+    @staticmethod
+    def invalidate_admin_stats() -> None:
+        """Drop cached admin statistics after users or reports change"""
+        cache_delete(ADMIN_STATS_CACHE_KEY)
+    
     @staticmethod
     def get_manager_stats(user_role: str) -> Dict[str, Any]:
         """Get statistics for manager dashboards"""
         try:
-            total_reports = Report.query.count()
-            pending_approvals = ReportService.get_pending_approvals(user_role)
-            approved_reports = Report.query.filter_by(status='APPROVED').count()
+            stage = APPROVAL_STAGE_BY_ROLE.get(user_role)
+            if stage is None:
+                pending_at_stage = false()
+            else:
+                pending_at_stage = and_(Report.status == 'PENDING', Report.approval_stage == stage)
+            
+            total_reports, approved_reports, pending_approvals = db.session.query(
+                db.func.count(Report.id),
+                db.func.count(Report.id).filter(Report.status == 'APPROVED'),
+                db.func.count(Report.id).filter(pending_at_stage)
+            ).one()
             
-            # Get recent reports
-            recent_reports = Report.query.order_by(
+            # Get recent reports with only the columns the dashboards render
+            recent_reports = Report.query.options(
+                load_only(Report.id, Report.document_title, Report.document_reference,
+                          Report.project_reference, Report.client_name, Report.user_email,
+                          Report.status, Report.created_at, Report.updated_at),
+                raiseload('*')
+            ).order_by(
                 Report.updated_at.desc()
             ).limit(10).all()
             
@@ -404,8 +485,10 @@ class SystemService:
         """Initialize database with default data"""
         try:
             # Create default admin user if none exists
-            admin = User.query.filter_by(role='Admin').first()
-            if not admin:
+            admin_exists = db.session.query(
+                User.query.filter_by(role='Admin').exists()
+            ).scalar()
+            if not admin_exists:
                 admin = User(
                     full_name='System Administrator',
                     email='admin@cullyautomation.com',
@@ -423,9 +506,14 @@ class SystemService:
                 'maintenance_mode': 'disabled'
             }
             
-            for key, value in default_settings.items():
-                if not SystemSettings.get_setting(key):
-                    SystemSettings.set_setting(key, value)
+            existing_keys = {key for (key,) in db.session.query(SystemSettings.key).filter(
+                SystemSettings.key.in_(default_settings)
+            )}
+            db.session.bulk_insert_mappings(SystemSettings, [
+                {'key': key, 'value': value}
+                for key, value in default_settings.items()
+                if key not in existing_keys
+            ])
             
             db.session.commit()
             return True
@@ -435,31 +523,50 @@ class SystemService:
             return False
     
     @staticmethod
-    def cleanup_old_data(days: int = 90) -> int:
-        """Clean up old draft reports and notifications"""
+    def cleanup_old_data(days: int = 90, batch_size: int = CLEANUP_BATCH_SIZE) -> int:
+        """Clean up old draft reports and notifications, committing every batch to keep locks short"""
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
             # Delete old draft reports
-            old_drafts = Report.query.filter(
-                Report.status == 'DRAFT',
-                Report.updated_at < cutoff_date
-            ).all()
-            
-            count = len(old_drafts)
-            for report in old_drafts:
-                db.session.delete(report)
+            count = 0
+            while True:
+                old_draft_ids = db.session.scalars(
+                    db.select(Report.id).where(
+                        Report.status == 'DRAFT',
+                        Report.updated_at < cutoff_date
+                    ).limit(batch_size)
+                ).all()
+                if not old_draft_ids:
+                    break
+                
+                # Type-specific rows first since bulk deletes skip ORM cascades
+                for detail_model in (SATReport, FDSReport, HDSReport, SiteSurveyReport, SDSReport, FATReport):
+                    detail_model.query.filter(
+                        detail_model.report_id.in_(old_draft_ids)
+                    ).delete(synchronize_session=False)
+                
+                count += Report.query.filter(
+                    Report.id.in_(old_draft_ids)
+                ).delete(synchronize_session=False)
+                db.session.commit()
             
             # Delete old read notifications
-            old_notifications = Notification.query.filter(
-                Notification.read,
-                Notification.created_at < cutoff_date
-            ).all()
-            
-            for notif in old_notifications:
-                db.session.delete(notif)
+            while True:
+                old_notification_ids = db.session.scalars(
+                    db.select(Notification.id).where(
+                        Notification.read.is_(True),
+                        Notification.created_at < cutoff_date
+                    ).limit(batch_size)
+                ).all()
+                if not old_notification_ids:
+                    break
+                
+                Notification.query.filter(
+                    Notification.id.in_(old_notification_ids)
+                ).delete(synchronize_session=False)
+                db.session.commit()
             
-            db.session.commit()
             return count
         except Exception as e:
             db.session.rollback()
@@ -1,16 +1,31 @@
 """
 Celery Background Tasks for Async Processing
 Handles time-consuming operations like email sending, report generation, and image processing
+
+Start workers with fair scheduling so short tasks are not held behind a running report:
+    celery -A tasks worker -Ofair
+Image tasks are routed to their own queue, served by a small worker that recycles often:
+    celery -A tasks worker -Q images -Ofair -c 2 --max-tasks-per-child=20
+Each worker process keeps its own connection pool, size it with DB_POOL_SIZE / DB_MAX_OVERFLOW
+(e.g. 5 / 10) so that concurrency x pool stays within the database connection limit.
 """
 
 import os
 import logging
-from celery import Celery
-from celery.result import AsyncResult
+from celery import Celery, chord
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
 from typing import Dict, Any, Optional
 
+from flask import current_app
+from PIL import Image
+
+from cache import cache
+from models import db, Report, User, Notification
+from utils import send_email, generate_sat_report, convert_to_pdf, quit_all_word_applications
+
 # Initialize Celery
 celery = Celery('tasks',
                 broker=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
@@ -18,9 +33,10 @@ celery = Celery('tasks',
 
 # Configure Celery
 celery.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer='msgpack',  # Smaller, faster to encode messages and results than JSON
+    accept_content=['msgpack', 'json'],
+    result_serializer='msgpack',
+    result_expires=3600,  # Evict finished results from Redis after an hour
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
@@ -28,37 +44,98 @@ celery.conf.update(
     task_soft_time_limit=240,  # 4 minutes soft limit
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=100,
+    worker_max_memory_per_child=512000,  # KiB, recycle a process once its RSS passes ~500MB
+    task_routes={
+        'tasks.process_image_async': {'queue': 'images'},
+        'tasks.process_images_batch_async': {'queue': 'images'},
+    },
+    task_acks_late=True,  # Acknowledge after completion so a busy worker does not hold reserved tasks
+    task_reject_on_worker_lost=True,
+    # Must exceed the longest task ETA/countdown or Redis redelivers the message
+    broker_transport_options={'visibility_timeout': 3600},
+    result_backend_transport_options={'visibility_timeout': 3600},
 )
 
 logger = logging.getLogger(__name__)
 
+# Emails per subtask when bulk_notification_async fans out
+NOTIFICATION_CHUNK_SIZE = 500
+
+# generate_analytics runs every 6 hours, the extra hour covers the gap until the next run
+ANALYTICS_CACHE_KEY = 'analytics:latest'
+ANALYTICS_CACHE_TIMEOUT = 7 * 60 * 60
+
+# Canvases up to this many pixels are kept for reuse (1 MP is 4 MB of RGBA)
+BACKGROUND_CACHE_MAX_PIXELS = 1_000_000
+
+# Flask app shared by every task in this worker process
+_app = None
+
+
+def _get_app():
+    """Return the worker's Flask app, creating it on first use"""
+    global _app
+    if _app is None:
+        # app -> routes -> services -> tasks, so the factory is only reachable once loading finishes
+        from app import create_app
+        _app = create_app()
+    return _app
+
 
-@celery.task(bind=True, name='tasks.send_email_async')
+@worker_process_init.connect
+def _init_worker_app(**kwargs):
+    """Build the app once per forked worker so its engine and pool are not shared across processes"""
+    _get_app()
+
+
+# Only the prefork pool sends worker_process_shutdown, solo and threads pools only send worker_shutdown
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _shutdown_worker_word(**kwargs):
+    """Quit the Word instances kept alive for PDF conversions"""
+    quit_all_word_applications()
+
+
+@celery.task(bind=True, name='tasks.send_email_async', max_retries=5, ignore_result=True)
 def send_email_async(self, recipient: str, subject: str, body: str, 
                      html_body: Optional[str] = None) -> Dict[str, Any]:
     """
-    Send email asynchronously
+    Send email asynchronously, retrying with exponential backoff while SMTP fails
     """
+    timestamp = datetime.utcnow().isoformat()
     try:
-        # Update task state
-        self.update_state(state='PROGRESS', meta={'status': 'Sending email...'})
-        
-        # Import here to avoid circular dependencies
-        from utils import send_email_notification
+        with _get_app().app_context():
+            # A missing recipient or missing credentials fail the same way on every attempt
+            if not recipient or not (current_app.config['SMTP_USERNAME'] and current_app.config['SMTP_PASSWORD']):
+                error = 'No recipient email provided' if not recipient else 'SMTP credentials are not configured'
+                logger.error(f"Not sending email to {recipient!r}: {error}")
+                return {
+                    'status': 'failed',
+                    'error': error,
+                    'timestamp': timestamp
+                }
+            
+            # One SMTP attempt per run, the backoff below is the only retry layer
+            sent = send_email(recipient, subject, html_body or body, body, retries=1)
         
-        result = send_email_notification(recipient, subject, body, html_body)
+        if not sent:
+            raise RuntimeError(f'SMTP delivery to {recipient} failed')
         
         return {
             'status': 'success',
             'message': f'Email sent to {recipient}',
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
     except Exception as e:
+        if self.request.retries < self.max_retries:
+            # Back off 30s, 60s, 120s, ... between attempts
+            raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries)
+        
         logger.error(f"Error sending email to {recipient}: {e}")
         return {
             'status': 'failed',
             'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
 
 
@@ -68,35 +145,30 @@ def generate_report_async(self, report_id: str, template_path: str,
     """
     Generate Word/PDF report asynchronously
     """
+    timestamp = datetime.utcnow().isoformat()
     try:
+        # Two progress writes per report, one when work starts and one before finalizing
         self.update_state(state='PROGRESS', 
                          meta={'status': 'Generating report...', 'progress': 10})
         
-        # Import here to avoid circular dependencies
-        from utils import generate_word_report, convert_to_pdf
-        from models import db, Report
-        
         # Generate Word document
-        self.update_state(state='PROGRESS',
-                         meta={'status': 'Creating Word document...', 'progress': 30})
-        
-        word_path = generate_word_report(template_path, output_path, data)
+        generated, word_path = generate_sat_report(data, output_path, template_path)
+        if not generated:
+            raise RuntimeError(word_path)
         
         # Convert to PDF if enabled
         pdf_path = None
         if os.environ.get('ENABLE_PDF_EXPORT', 'False').lower() == 'true':
-            self.update_state(state='PROGRESS',
-                             meta={'status': 'Converting to PDF...', 'progress': 60})
-            pdf_path = convert_to_pdf(word_path)
+            # convert_to_pdf reads the app config, and Word stays running for the next report
+            with _get_app().app_context():
+                pdf_path = convert_to_pdf(word_path, reuse_word=True)
         
         # Update report status
         self.update_state(state='PROGRESS',
-                         meta={'status': 'Updating database...', 'progress': 90})
+                         meta={'status': 'Finalizing...', 'progress': 90})
         
         # Use app context for database operations
-        from app import create_app
-        app = create_app()
-        with app.app_context():
+        with _get_app().app_context():
             report = Report.query.get(report_id)
             if report:
                 report.updated_at = datetime.utcnow()
@@ -107,7 +179,7 @@ def generate_report_async(self, report_id: str, template_path: str,
             'word_path': word_path,
             'pdf_path': pdf_path,
             'report_id': report_id,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
     except Exception as e:
         logger.error(f"Error generating report {report_id}: {e}")
@@ -115,137 +187,203 @@ def generate_report_async(self, report_id: str, template_path: str,
             'status': 'failed',
             'error': str(e),
             'report_id': report_id,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
 
 
-@celery.task(bind=True, name='tasks.process_image_async')
-def process_image_async(self, image_path: str, operations: list) -> Dict[str, Any]:
+@lru_cache(maxsize=4)
+def _cached_white_background(size: tuple) -> Image.Image:
+    return Image.new('RGBA', size, (255, 255, 255, 255))
+
+
+def _white_background(size: tuple) -> Image.Image:
+    """Opaque white RGBA canvas, small ones are shared between same-sized images (alpha_composite does not modify it)"""
+    if size[0] * size[1] > BACKGROUND_CACHE_MAX_PIXELS:
+        # Large photos are rarely the same size twice, holding their canvases would pin the worker's memory
+        return Image.new('RGBA', size, (255, 255, 255, 255))
+    return _cached_white_background(size)
+
+
+def _process_one(image_path: str, operations: list, optimize: bool = False) -> str:
     """
-    Process images asynchronously (resize, optimize, convert)
+    Apply operations to one image and save it as JPEG, returns the processed path
+
+    optimize=True trades a second Huffman encoding pass for a few percent smaller files
     """
+    img = Image.open(image_path)
     try:
-        self.update_state(state='PROGRESS', meta={'status': 'Processing image...'})
-        
-        from PIL import Image
-        import io
-        
-        # Open image
-        img = Image.open(image_path)
-        
-        # Apply operations
         for op in operations:
+            processed = img
             if op['type'] == 'resize':
-                img = img.resize((op['width'], op['height']), Image.LANCZOS)
+                # Let libjpeg decode straight at a reduced scale, keeping 2x headroom for LANCZOS
+                img.draft(img.mode, (op['width'] * 2, op['height'] * 2))
+                # Integer reduce() down to 2x the target first, so LANCZOS only sees the small image
+                processed = img.resize((op['width'], op['height']), Image.LANCZOS, reducing_gap=2.0)
             elif op['type'] == 'convert':
-                img = img.convert(op['mode'])
+                processed = img.convert(op['mode'])
             elif op['type'] == 'rotate':
-                img = img.rotate(op['angle'])
+                processed = img.rotate(op['angle'])
             elif op['type'] == 'optimize':
                 # Optimize for web
                 if img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
+                    rgba = img if img.mode == 'RGBA' else img.convert('RGBA')
+                    processed = Image.alpha_composite(_white_background(img.size), rgba).convert('RGB')
+            
+            # Release each intermediate buffer as soon as the next one exists
+            if processed is not img:
+                img.close()
+                img = processed
         
         # Save processed image
         output_path = image_path.rsplit('.', 1)[0] + '_processed.jpg'
-        img.save(output_path, 'JPEG', quality=85, optimize=True)
+        # Write aside and swap in, so readers never see a half-written file
+        tmp_path = output_path + '.tmp'
+        img.save(tmp_path, 'JPEG', quality=85, subsampling='4:2:0', optimize=optimize)
+        os.replace(tmp_path, output_path)
+        return output_path
+    finally:
+        img.close()
+
+
+@celery.task(bind=True, name='tasks.process_image_async')
+def process_image_async(self, image_path: str, operations: list,
+                        optimize: bool = False) -> Dict[str, Any]:
+    """
+    Process images asynchronously (resize, optimize, convert)
+    """
+    timestamp = datetime.utcnow().isoformat()
+    try:
+        self.update_state(state='PROGRESS', meta={'status': 'Processing image...'})
+        
+        output_path = _process_one(image_path, operations, optimize)
         
         return {
             'status': 'success',
             'original_path': image_path,
             'processed_path': output_path,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
     except Exception as e:
         logger.error(f"Error processing image {image_path}: {e}")
         return {
             'status': 'failed',
             'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
 
 
-@celery.task(bind=True, name='tasks.bulk_notification_async')
-def bulk_notification_async(self, user_emails: list, title: str, 
-                           message: str, notification_type: str = 'info') -> Dict[str, Any]:
+@celery.task(bind=True, name='tasks.process_images_batch_async')
+def process_images_batch_async(self, image_paths: list, operations: list,
+                               optimize: bool = False) -> Dict[str, Any]:
     """
-    Send bulk notifications asynchronously
+    Process several images in one task, e.g. group(process_images_batch_async.s(chunk, ops) ...)
+    with chunks of ~32 paths, instead of one task per image
+    """
+    timestamp = datetime.utcnow().isoformat()
+    self.update_state(state='PROGRESS',
+                     meta={'status': 'Processing images...', 'total': len(image_paths)})
+    
+    processed = []
+    failed = []
+    for image_path in image_paths:
+        try:
+            processed.append({'original_path': image_path,
+                              'processed_path': _process_one(image_path, operations, optimize)})
+        except Exception as e:
+            logger.error(f"Error processing image {image_path}: {e}")
+            failed.append({'original_path': image_path, 'error': str(e)})
+    
+    return {
+        'status': 'success' if not failed else 'partial',
+        'processed': processed,
+        'failed': failed,
+        'timestamp': timestamp
+    }
+
+
+@celery.task(name='tasks.insert_notifications_chunk')
+def _insert_notifications_chunk(user_emails: list, title: str, message: str,
+                                notification_type: str = 'info') -> tuple:
+    """
+    Insert one slice of a bulk notification, returns (sent, failed)
     """
     try:
-        self.update_state(state='PROGRESS', 
-                         meta={'status': 'Sending notifications...', 'total': len(user_emails)})
+        rows = [{'user_email': email, 'title': title, 'message': message, 'type': notification_type}
+                for email in user_emails]
         
-        from models import db, Notification
-        from app import create_app
+        # services imports this module to queue emails, so it cannot be imported at load time
+        from services import NotificationService
         
-        app = create_app()
-        with app.app_context():
-            sent_count = 0
-            failed_count = 0
-            
-            for i, email in enumerate(user_emails):
-                try:
-                    notification = Notification(
-                        user_email=email,
-                        title=title,
-                        message=message,
-                        type=notification_type
-                    )
-                    db.session.add(notification)
-                    sent_count += 1
-                    
-                    # Update progress
-                    self.update_state(state='PROGRESS',
-                                     meta={'status': f'Sending {i+1}/{len(user_emails)}...',
-                                          'progress': int((i+1) / len(user_emails) * 100)})
-                except Exception as e:
-                    logger.error(f"Failed to create notification for {email}: {e}")
-                    failed_count += 1
-            
+        with _get_app().app_context():
+            db.session.execute(Notification.__table__.insert(), rows)
             db.session.commit()
+            for email in set(user_emails):
+                NotificationService.invalidate_unread_count(email)
         
-        return {
-            'status': 'success',
-            'sent': sent_count,
-            'failed': failed_count,
-            'total': len(user_emails),
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        return len(rows), 0
     except Exception as e:
-        logger.error(f"Error sending bulk notifications: {e}")
-        return {
-            'status': 'failed',
-            'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        logger.error(f"Failed to create {len(user_emails)} notifications: {e}")
+        return 0, len(user_emails)
 
 
-@celery.task(name='tasks.cleanup_old_data')
+@celery.task(name='tasks.aggregate_notification_results')
+def _aggregate_results(results: list) -> Dict[str, Any]:
+    """
+    Chord callback summing the (sent, failed) pairs of each slice
+    """
+    timestamp = datetime.utcnow().isoformat()
+    sent_count = sum(sent for sent, _ in results)
+    failed_count = sum(failed for _, failed in results)
+    return {
+        'status': 'success' if not failed_count else 'partial',
+        'sent': sent_count,
+        'failed': failed_count,
+        'total': sent_count + failed_count,
+        'timestamp': timestamp
+    }
+
+
+@celery.task(bind=True, name='tasks.bulk_notification_async')
+def bulk_notification_async(self, user_emails: list, title: str, 
+                           message: str, notification_type: str = 'info') -> Dict[str, Any]:
+    """
+    Send bulk notifications asynchronously, fanning the inserts out across workers
+    """
+    if not user_emails:
+        return _aggregate_results([])
+    
+    header = [_insert_notifications_chunk.s(user_emails[i:i + NOTIFICATION_CHUNK_SIZE],
+                                            title, message, notification_type)
+              for i in range(0, len(user_emails), NOTIFICATION_CHUNK_SIZE)]
+    
+    # Replace this task with the chord so its result becomes the aggregated totals
+    return self.replace(chord(header, _aggregate_results.s()))
+
+
+@celery.task(name='tasks.cleanup_old_data', ignore_result=True)
 def cleanup_old_data(days: int = 90) -> Dict[str, Any]:
     """
     Periodic task to clean up old data
     """
+    timestamp = datetime.utcnow().isoformat()
     try:
+        # services imports this module to queue emails, so it cannot be imported at load time
         from services import SystemService
-        from app import create_app
         
-        app = create_app()
-        with app.app_context():
+        with _get_app().app_context():
             deleted_count = SystemService.cleanup_old_data(days)
         
         return {
             'status': 'success',
             'deleted_reports': deleted_count,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
     except Exception as e:
         logger.error(f"Error cleaning up old data: {e}")
         return {
             'status': 'failed',
             'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
 
 
@@ -254,21 +392,22 @@ def generate_analytics() -> Dict[str, Any]:
     """
     Generate system analytics and reports
     """
+    timestamp = datetime.utcnow().isoformat()
     try:
-        from models import db, Report, User
-        from app import create_app
-        
-        app = create_app()
-        with app.app_context():
-            # Gather analytics
-            total_users = User.query.count()
-            active_users = User.query.filter_by(status='Active').count()
-            total_reports = Report.query.count()
+        with _get_app().app_context():
+            # Gather analytics, one conditional-aggregate query per table
+            total_users, active_users = db.session.query(
+                db.func.count(User.id),
+                db.func.count(User.id).filter(User.status == 'Active')
+            ).one()
             
             # Reports by status
-            draft_reports = Report.query.filter_by(status='DRAFT').count()
-            pending_reports = Report.query.filter_by(status='PENDING').count()
-            approved_reports = Report.query.filter_by(status='APPROVED').count()
+            total_reports, draft_reports, pending_reports, approved_reports = db.session.query(
+                db.func.count(Report.id),
+                db.func.count(Report.id).filter(Report.status == 'DRAFT'),
+                db.func.count(Report.id).filter(Report.status == 'PENDING'),
+                db.func.count(Report.id).filter(Report.status == 'APPROVED')
+            ).one()
             
             # Reports by type
             report_types = db.session.query(
@@ -290,24 +429,27 @@ def generate_analytics() -> Dict[str, Any]:
                     },
                     'by_type': dict(report_types)
                 },
-                'generated_at': datetime.utcnow().isoformat()
+                'generated_at': timestamp
             }
             
-            # Store analytics (could be saved to file, cache, or database)
-            cache_key = f"analytics_{datetime.utcnow().strftime('%Y%m%d')}"
-            # Here you would store to Redis or another cache
+            # Serve analytics from the shared cache until the next beat run, an in-process
+            # cache would keep them private to this worker where the web app never sees them
+            if current_app.config['CACHE_TYPE'] == 'RedisCache':
+                cache.set(ANALYTICS_CACHE_KEY, analytics, timeout=ANALYTICS_CACHE_TIMEOUT)
+            else:
+                logger.warning("REDIS_URL is not set, analytics are not cached for the web app")
             
             return {
                 'status': 'success',
                 'analytics': analytics,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp
             }
     except Exception as e:
         logger.error(f"Error generating analytics: {e}")
         return {
             'status': 'failed',
             'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': timestamp
         }
 
 
@@ -325,22 +467,33 @@ celery.conf.beat_schedule = {
 }
 
 
+def get_cached_analytics() -> Optional[Dict[str, Any]]:
+    """
+    Get the analytics stored by the last generate_analytics run, None if expired or not yet run
+
+    Must be called inside an app context
+    """
+    return cache.get(ANALYTICS_CACHE_KEY)
+
+
 def get_task_status(task_id: str) -> Dict[str, Any]:
     """
     Get the status of a Celery task
     """
     try:
-        result = AsyncResult(task_id, app=celery)
+        # One backend read, AsyncResult refetches on every .state/.info access until the task is ready
+        meta = celery.backend.get_task_meta(task_id)
+        state = meta['status']
         
-        if result.state == 'PENDING':
+        if state == 'PENDING':
             return {'state': 'PENDING', 'status': 'Task not found or not started'}
-        elif result.state == 'PROGRESS':
-            return {'state': 'PROGRESS', **result.info}
-        elif result.state == 'SUCCESS':
-            return {'state': 'SUCCESS', 'result': result.result}
-        elif result.state == 'FAILURE':
-            return {'state': 'FAILURE', 'error': str(result.info)}
+        elif state == 'PROGRESS':
+            return {'state': 'PROGRESS', **meta['result']}
+        elif state == 'SUCCESS':
+            return {'state': 'SUCCESS', 'result': meta['result']}
+        elif state == 'FAILURE':
+            return {'state': 'FAILURE', 'error': str(meta['result'])}
         else:
-            return {'state': result.state}
+            return {'state': state}
     except Exception as e:
         return {'state': 'ERROR', 'error': str(e)}
\ No newline at end of file
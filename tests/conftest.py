@@ -3,21 +3,81 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
+from werkzeug.security import generate_password_hash
 from app import create_app, db
+from cache import cache
+from models import User
 
-@pytest.fixture
+# Hashed once at import so fixtures can insert users without paying for a hash each time
+ACTIVE_USER_PASSWORD = 'password'
+ACTIVE_USER_PASSWORD_HASH = generate_password_hash(ACTIVE_USER_PASSWORD, method='pbkdf2:sha256:1')
+
+@pytest.fixture(scope='session')
 def app():
-    """Create and configure a new app instance for each test."""
-    # create a temporary file to isolate the database for each test
+    """Create the app and its schema once for the whole test session."""
     app = create_app(config_class_name='testing')
 
+    # No context stays pushed during tests, requests would otherwise reuse it and share g
     with app.app_context():
         db.create_all()
-        yield app
+    yield app
+    with app.app_context():
         db.drop_all()
 
 
+@pytest.fixture(autouse=True)
+def db_session(app):
+    """Run each test inside a transaction that is rolled back on teardown."""
+    with app.app_context():
+        engines = db.engines
+    engine = engines[None]
+    connection = engine.connect()
+    transaction = connection.begin()
+    if connection.dialect.name == 'sqlite':
+        # pysqlite defers BEGIN until the first write, a SAVEPOINT released before that would commit
+        connection.exec_driver_sql('BEGIN')
+
+    # Flask-SQLAlchemy resolves binds through db.engines, so sessions pick up the open connection
+    # Both are Flask-SQLAlchemy internals, requirements.txt pins the versions checked against them
+    engines[None] = connection
+    session = db.session
+    db.session = db._make_scoped_session({'join_transaction_mode': 'create_savepoint'})
+
+    yield db.session
+
+    db.session = session
+    engines[None] = engine
+    transaction.rollback()
+    connection.close()
+
+
 @pytest.fixture
 def client(app):
     """A test client for the app."""
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
+
+
+@pytest.fixture
+def active_user(app, db_session):
+    """An approved Engineer inserted directly, logs in with ACTIVE_USER_PASSWORD."""
+    with app.app_context():
+        user = User(
+            full_name='Active User',
+            email='active@example.com',
+            password_hash=ACTIVE_USER_PASSWORD_HASH,
+            role='Engineer',
+            status='Active'
+        )
+        db_session.add(user)
+        db_session.commit()
+        # Load the attributes before the context ends so the detached instance stays readable
+        db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def simple_cache(app):
+    """Swap the testing NullCache for an in-process cache so cached paths actually cache."""
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    yield cache
+    cache.init_app(app)
@@ -1,5 +1,5 @@
 
-from models import User
+from models import db, User
 
 def test_register_and_login(client, app):
     # Register a new user
@@ -15,10 +15,57 @@ def test_register_and_login(client, app):
         user = User.query.filter_by(email='test@example.com').first()
         assert user is not None
         user.status = 'Active'
+        db.session.commit()
+        user_id = user.id
 
     # Login with the new user
     response = client.post('/auth/login', data={
         'email': 'test@example.com',
         'password': 'password'
-    }, follow_redirects=True)
-    assert response.status_code == 200
+    })
+    assert response.status_code == 302
+    assert response.headers['Location'].startswith('/dashboard/')
+    with client.session_transaction() as session:
+        assert session['_user_id'] == str(user_id)
+
+def test_user_loader_registered(app):
+    from auth import login_manager, load_user
+    assert app.login_manager is login_manager
+    assert login_manager._user_callback is load_user
+
+def test_login_active_user(client, active_user):
+    response = client.post('/auth/login', data={
+        'email': active_user.email,
+        'password': 'password'
+    })
+    assert response.status_code == 302
+    assert response.headers['Location'].startswith('/dashboard/')
+    with client.session_transaction() as session:
+        assert session['_user_id'] == str(active_user.id)
+
+def test_disabled_user_loses_role_pages(client, app, active_user):
+    from services import UserService
+    client.post('/auth/login', data={
+        'email': active_user.email,
+        'password': 'password'
+    })
+    assert client.get('/dashboard/engineer').status_code == 200
+
+    with app.app_context():
+        UserService.update_user_status(active_user.id, 'Disabled')
+    response = client.get('/dashboard/engineer')
+    assert response.status_code == 302
+    assert '/auth/login' in response.headers['Location']
+
+def test_load_user_survives_cache_outage(app, active_user, monkeypatch):
+    from auth import load_user
+    from cache import cache
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError('cache down')
+
+    with app.app_context():
+        for name in ('get', 'set', 'delete'):
+            monkeypatch.setattr(cache.cache, name, unreachable)
+        user = load_user(str(active_user.id))
+    assert user.email == active_user.email
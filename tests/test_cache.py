@@ -0,0 +1,68 @@
+
+from models import db, User, Notification
+
+
+def test_user_cache_is_stale_until_invalidated(app, active_user, simple_cache):
+    from auth import load_user, invalidate_user_cache
+
+    with app.app_context():
+        assert load_user(str(active_user.id)).status == 'Active'
+
+        # Written behind the cache's back, so the cached session user stays stale
+        db.session.get(User, active_user.id).status = 'Disabled'
+        db.session.commit()
+        assert load_user(str(active_user.id)).status == 'Active'
+
+        invalidate_user_cache(active_user.id)
+        assert load_user(str(active_user.id)).status == 'Disabled'
+
+
+def test_update_user_status_invalidates_cached_user(app, active_user, simple_cache):
+    from auth import load_user
+    from services import UserService
+
+    with app.app_context():
+        assert load_user(str(active_user.id)).is_active()
+        UserService.update_user_status(active_user.id, 'Disabled')
+        assert not load_user(str(active_user.id)).is_active()
+
+
+def test_unread_count_is_stale_until_invalidated(app, active_user, simple_cache):
+    from services import NotificationService
+
+    with app.app_context():
+        assert NotificationService.get_unread_count(active_user.email) == 0
+
+        db.session.add(Notification(user_email=active_user.email, title='Hi', message='Hello', type='info'))
+        db.session.commit()
+        assert NotificationService.get_unread_count(active_user.email) == 0
+
+        NotificationService.invalidate_unread_count(active_user.email)
+        assert NotificationService.get_unread_count(active_user.email) == 1
+
+
+def test_create_notification_invalidates_unread_count(app, active_user, simple_cache):
+    from services import NotificationService
+
+    with app.app_context():
+        assert NotificationService.get_unread_count(active_user.email) == 0
+        Notification.create_notification(active_user.email, 'Hi', 'Hello', 'info')
+        assert NotificationService.get_unread_count(active_user.email) == 1
+
+
+def test_unread_count_error_is_not_cached(app, active_user, simple_cache, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Query
+    from utils import get_unread_count
+
+    with app.app_context():
+        db.session.add(Notification(user_email=active_user.email, title='Hi', message='Hello', type='info'))
+        db.session.commit()
+
+        def unavailable(self):
+            raise OperationalError('SELECT count(*)', {}, Exception('database is unavailable'))
+
+        with monkeypatch.context() as patch:
+            patch.setattr(Query, 'count', unavailable)
+            assert get_unread_count(active_user.email) == 0
+        assert get_unread_count(active_user.email) == 1
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Script to upgrade an existing database to the current schema
+Run this once after deploying a release that adds columns or indexes
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, upgrade_schema
+
+def upgrade_database():
+    """Add missing columns and indexes to existing tables"""
+    print("🔧 Upgrading database schema...")
+
+    # Create Flask app
+    app = create_app()
+
+    with app.app_context():
+        try:
+            upgrade_schema()
+            print("✅ Database schema is up to date")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Database upgrade failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    print("🔄 Database Upgrade Script")
+    print("==========================")
+
+    if not upgrade_database():
+        sys.exit(1)
@@ -11,6 +11,7 @@ from werkzeug.utils import secure_filename
 import uuid
 import platform
 import tempfile
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 
@@ -18,7 +19,7 @@ from datetime import datetime
 def get_unread_count(user_email=None):
     """Get unread notifications count for a user"""
     try:
-        from models import Notification
+        from services import NotificationService
         from flask_login import current_user
 
         if not user_email and current_user.is_authenticated:
@@ -27,10 +28,7 @@ def get_unread_count(user_email=None):
         if not user_email:
             return 0
 
-        return Notification.query.filter_by(
-            user_email=user_email,
-            read=False
-        ).count()
+        return NotificationService.get_unread_count(user_email)
     except Exception as e:
         if current_app:
             current_app.logger.warning(f"Could not get unread count: {e}")
@@ -330,8 +328,8 @@ def save_submissions(submissions):
 
 # --------------------
 # Email functions
-def send_email(to_email, subject, html_content, text_content=None):
-    """Send an HTML email with plain text fallback"""
+def send_email(to_email, subject, html_content, text_content=None, retries=3):
+    """Send an HTML email with plain text fallback, making up to retries SMTP attempts"""
     if not to_email:
         logger.warning("No recipient email provided")
         return False
@@ -357,7 +355,6 @@ def send_email(to_email, subject, html_content, text_content=None):
     msg.set_content(text_content or html_content.replace("<br>", "\n").replace("<p>", "").replace("</p>", "\n\n"))
     msg.add_alternative(html_content, subtype="html")
 
-    retries = 3
     for i in range(retries):
         try:
             logger.info(f"Email send attempt {i+1}/{retries}")
@@ -370,6 +367,10 @@ def send_email(to_email, subject, html_content, text_content=None):
                 server.send_message(msg)
             logger.info(f"Email sent successfully to {to_email}")
             return True
+        except (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+            # Rejected credentials or addresses fail the same way on the next attempt
+            logger.error(f"Email to {to_email} rejected: {str(e)}")
+            return False
         except Exception as e:
             logger.error(f"Email attempt {i+1}/{retries} failed: {str(e)}", exc_info=True)
             if i == retries - 1:
@@ -581,8 +582,76 @@ def update_toc(doc_path):
     finally:
         pythoncom.CoUninitialize()
 
-def convert_to_pdf(docx_path):
-    """Convert a DOCX file to PDF using Word automation"""
+# Word instance per thread for long-lived workers. COM is initialized multithreaded so the
+# out-of-process Word proxies stay callable from whichever thread handles worker shutdown
+_word_local = threading.local()
+_kept_words = []
+_kept_words_lock = threading.Lock()
+
+def _get_word_application():
+    """Return this thread's running Word instance, starting Word on first use"""
+    word = getattr(_word_local, 'word', None)
+    if word is None:
+        pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)  # Stays initialized until quit_word_application()
+        try:
+            word = win32com.client.Dispatch("Word.Application")
+            word.Visible = False
+        except Exception:
+            pythoncom.CoUninitialize()
+            raise
+        _word_local.word = word
+        with _kept_words_lock:
+            _kept_words.append(word)
+    return word
+
+def _release_kept_word(word):
+    """Stop tracking word, False if quit_all_word_applications() already took it"""
+    with _kept_words_lock:
+        for i, kept in enumerate(_kept_words):
+            if kept is word:
+                del _kept_words[i]
+                return True
+    return False
+
+def _quit_word(word):
+    try:
+        word.Quit()
+    except Exception as e:
+        logger.warning(f"Error quitting Word: {e}")
+
+def quit_word_application():
+    """Quit the Word instance kept by this thread, if any"""
+    word = getattr(_word_local, 'word', None)
+    if word is None:
+        return
+    _word_local.word = None
+    try:
+        if _release_kept_word(word):
+            _quit_word(word)
+    finally:
+        pythoncom.CoUninitialize()
+
+def quit_all_word_applications():
+    """Quit the Word instances kept by every thread, for worker pools that run tasks on threads"""
+    with _kept_words_lock:
+        words = _kept_words[:]
+        del _kept_words[:]
+    if not words:
+        return
+    pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+    try:
+        for word in words:
+            _quit_word(word)
+    finally:
+        pythoncom.CoUninitialize()
+
+def convert_to_pdf(docx_path, reuse_word=False):
+    """Convert a DOCX file to PDF using Word automation
+
+    reuse_word keeps Word running in this thread for the next conversion instead of paying
+    its multi-second startup every time; only pass it from long-lived threads such as Celery
+    workers, which call quit_all_word_applications() on shutdown
+    """
     if not current_app.config.get('ENABLE_PDF_EXPORT', False):
         logger.warning("PDF export is disabled in configuration")
         return None
@@ -591,25 +660,27 @@ def convert_to_pdf(docx_path):
         logger.warning("Windows COM automation not available - PDF conversion not supported on this platform")
         return None
 
-    pythoncom.CoInitialize()  # Initialize COM for the thread
-    try:
-        word = win32com.client.Dispatch("Word.Application")
-        word.Visible = False
-        abs_doc_path = os.path.abspath(docx_path)
-        pdf_path = abs_doc_path.replace('.docx', '.pdf')
+    abs_doc_path = os.path.abspath(docx_path)
+    pdf_path = abs_doc_path.replace('.docx', '.pdf')
 
-        doc = word.Documents.Open(abs_doc_path)
-        doc.SaveAs(pdf_path, FileFormat=17)  # 17 = PDF format
-        doc.Close()
-        word.Quit()
+    # A kept instance may have been closed or crashed since the last call, so retry once on a fresh one
+    for attempt in range(2 if reuse_word else 1):
+        try:
+            word = _get_word_application()
+            doc = word.Documents.Open(abs_doc_path)
+            doc.SaveAs(pdf_path, FileFormat=17)  # 17 = PDF format
+            doc.Close()
 
-        logger.info(f"PDF created: {pdf_path}")
-        return pdf_path
-    except Exception as e:
-        logger.error(f"Error converting to PDF: {e}", exc_info=True)
-        return None
-    finally:
-        pythoncom.CoUninitialize()
+            logger.info(f"PDF created: {pdf_path}")
+            return pdf_path
+        except Exception as e:
+            quit_word_application()
+            if attempt or not reuse_word:
+                logger.error(f"Error converting to PDF: {e}", exc_info=True)
+        finally:
+            if not reuse_word:
+                quit_word_application()
+    return None
 
 # --------------------
 # Form processing helpers